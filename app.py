@@ -1,17 +1,40 @@
 import streamlit as st
+import diskcache
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from transliterator import translit
 import os
 from dotenv import load_dotenv
 import time
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from functools import partial
 import hashlib
 import logging
+import random
+import re
+import threading
+import unicodedata
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-load_dotenv()  # Load environment variables from .env file
+
+@st.cache_resource(show_spinner=False)
+def _load_env() -> bool:
+    """Load environment variables from the .env file once per process"""
+    return load_dotenv()
+
+
+_load_env()
 
 # Get API key from Streamlit secrets or environment variables
 try:
@@ -36,26 +59,390 @@ except Exception as e:
 
 # Google AI Studio API configuration
 GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-lite-001:generateContent"  # Adjust endpoint based on Google's latest API
+# Server-sent events variant of the same model, used to show partial output
+GEMINI_STREAM_URL = GEMINI_API_URL.replace(":generateContent", ":streamGenerateContent")
+# Prefix the pooled HTTP adapter is mounted on
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/"
+# Namespaces cached responses, so switching models doesn't serve stale output
+GEMINI_MODEL = GEMINI_API_URL.rsplit("/", 1)[1].split(":", 1)[0]
+
+# Sampling settings sent with every request
+GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "maxOutputTokens": 2048,
+    "topP": 0.9,
+    "topK": 40,
+}
+
+# Long inputs are split into chunks that are transliterated concurrently
+MAX_CHUNK_CHARS = 500
+# Caps the numbered lines per request so the model keeps the numbering straight
+MAX_CHUNK_LINES = 40
+MAX_CONCURRENT_REQUESTS = 4
+# Texts needing more chunks than this skip Gemini and stay rule-based, so one
+# big upload can't hold the script thread and the shared rate limit for minutes
+MAX_CHUNKS_PER_TEXT = 20
+# How long to wait for a line another session is already requesting
+INFLIGHT_TIMEOUT = 60  # seconds
+# The session is shared by every browser session, so keep enough idle
+# connections for a few users' worth of concurrent chunk requests
+HTTP_POOL_SIZE = 10
+# Recent Gemini results for whole texts, kept in memory for an hour; big
+# texts are skipped (their lines are still cached on disk), and the memo as a
+# whole holds at most LLM_MEMO_TOTAL_CHARS of input and output
+LLM_MEMO_SIZE = 1024
+LLM_MEMO_TTL = 3600  # seconds
+LLM_MEMO_MAX_CHARS = 20_000
+LLM_MEMO_TOTAL_CHARS = 1_000_000
+# Threads running the rule-based pass next to the Gemini request
+RULE_WORKERS = 4
+# Recent rule-based results kept for resubmitted text; big uploads are skipped,
+# and the memo as a whole holds at most RULE_MEMO_TOTAL_CHARS of input and
+# output (a few MB)
+RULE_MEMO_SIZE = 1024
+RULE_MEMO_MAX_CHARS = 20_000
+RULE_MEMO_TOTAL_CHARS = 1_000_000
+
+# Responses are also kept on disk so they survive app restarts; point
+# COPTIC_CACHE_DIR at a shared path to share them between app processes
+DISK_CACHE_DIR = os.environ.get("COPTIC_CACHE_DIR", ".gemini_cache")
+DISK_CACHE_SIZE_LIMIT = 200 << 20  # 200 MB
+DISK_CACHE_EXPIRE = 30 * 24 * 3600  # 30 days
+# Lines longer than this are hashed incrementally for their cache key
+HASH_BLOCK_CHARS = 64 * 1024
+
+# Transient Gemini errors (rate limiting, model warm-up) are retried a few times
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_ATTEMPTS = 3  # including the first
+RETRY_BACKOFF_FACTOR = 1.0
+RETRY_BACKOFF_MAX = 30.0  # seconds, also caps a server's Retry-After
+
+# Client-side pacing of Gemini requests, shared by all sessions
+RATE_LIMIT_BURST = 5
+RATE_LIMIT_PER_SECOND = 1.0
+RATE_LIMIT_MAX_WAIT = 10.0  # seconds
+
+
+class _JitteredRetry(Retry):
+    """urllib3 Retry with full jitter applied to the exponential backoff"""
+
+    def get_backoff_time(self) -> float:
+        # Clamped here because urllib3 1.x has no backoff_max argument
+        backoff = min(RETRY_BACKOFF_MAX, super().get_backoff_time())
+        return random.uniform(0, backoff)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        # A long Retry-After would otherwise block the script thread for as
+        # long as the server asks
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(RETRY_BACKOFF_MAX, retry_after)
+
+
+class _ApiStats:
+    """Process-wide counters for Gemini API calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def record_retries(self, count: int):
+        with self._lock:
+            self.retries += count
+
+
+@st.cache_resource(show_spinner=False)
+def _api_stats() -> _ApiStats:
+    """Shared API counters, shown in the sidebar"""
+    return _ApiStats()
+
+
+class _CircuitBreaker:
+    """Skips Gemini calls for a cooldown period after repeated failures"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, fail_max: int = 3, reset_timeout: float = 60):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # Thread holding the single trial request while half-open
+        self._trial_owner: Optional[int] = None
+
+    def _refresh(self):
+        # After the cooldown, the next request may go through as a trial
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = self.HALF_OPEN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return True
+            # One trial request decides; everyone else waits for its outcome
+            if self._state == self.HALF_OPEN and self._trial_owner is None:
+                self._trial_owner = threading.get_ident()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_owner = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_owner = None
+            if self._state == self.HALF_OPEN or self._failures >= self.fail_max:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Give up the trial slot without an outcome, e.g. nothing was sent"""
+        with self._lock:
+            if self._trial_owner == threading.get_ident():
+                self._trial_owner = None
+
+
+@st.cache_resource(show_spinner=False)
+def _circuit_breaker() -> _CircuitBreaker:
+    """Shared circuit breaker around the Gemini endpoint"""
+    return _CircuitBreaker(fail_max=3, reset_timeout=60)
+
+
+class _TokenBucket:
+    """Paces outgoing Gemini requests so bursts don't run into 429s"""
+
+    def __init__(self, capacity: float = 5, rate: float = 1.0):
+        self.capacity = capacity
+        self.rate = rate  # tokens per second
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take a token, sleeping up to max_wait seconds for one to become free"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+@st.cache_resource(show_spinner=False)
+def _rate_limiter() -> _TokenBucket:
+    """Shared admission limit for Gemini requests from all sessions"""
+    return _TokenBucket(capacity=RATE_LIMIT_BURST, rate=RATE_LIMIT_PER_SECOND)
+
+
+@st.cache_resource(show_spinner=False)
+def _gemini_session() -> requests.Session:
+    """Shared HTTP session so connections to Gemini are kept alive between calls"""
+    session = requests.Session()
+    session.headers.update(
+        {
+            "Content-Type": "application/json",
+            "x-goog-api-key": GEMINI_API_KEY,
+        }
+    )
+    retry = _JitteredRetry(
+        total=RETRY_ATTEMPTS - 1,
+        read=False,  # never resend a request whose response timed out
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the final response to raise_for_status()
+    )
+    # All traffic goes to one host, so a single pool sized for the
+    # concurrent requests is enough
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry
+    )
+    session.mount(GEMINI_BASE_URL, adapter)
+    return session
 
 
-# Cache for API responses to improve performance
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def cached_llm_transliterate(text_hash: str, text: str) -> Optional[str]:
-    """Cached LLM transliteration to avoid repeated API calls"""
-    return llm_transliterate_internal(text)
-
+@st.cache_resource(show_spinner=False)
+def _disk_cache() -> diskcache.Cache:
+    """Persistent cache of Gemini responses, shared across sessions and restarts"""
+    return diskcache.Cache(DISK_CACHE_DIR, size_limit=DISK_CACHE_SIZE_LIMIT)
 
-def llm_transliterate_internal(text: str) -> Optional[str]:
-    """Internal function for LLM transliteration using Gemini 2.0 Flash"""
-    if not GEMINI_API_KEY:
-        return None
 
-    headers = {
-        "Content-Type": "application/json",
-    }
+def _cache_key(line: str) -> str:
+    """Compact, non-cryptographic disk cache key for a line of canonical text"""
+    if len(line) <= HASH_BLOCK_CHARS:
+        data = line.encode("utf-8")
+        if xxhash is not None:
+            return xxhash.xxh3_128_hexdigest(data)
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
 
-    # Prompt optimized for Gemini 2.0 Flash Lite
-    prompt = f"""You are an expert in Coptic language transliteration. Your task is to transliterate Coptic text to Latin script using standard transliteration conventions.
+    # Very long lines are encoded and hashed block by block, so no second
+    # full-size copy of the text is materialized
+    if xxhash is not None:
+        hasher = xxhash.xxh3_128()
+    else:
+        hasher = hashlib.blake2b(digest_size=16)
+    for start in range(0, len(line), HASH_BLOCK_CHARS):
+        hasher.update(line[start : start + HASH_BLOCK_CHARS].encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class _InFlightLines:
+    """Futures for lines whose Gemini request is currently running"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+
+    def claim(self, lines: List[str]) -> Tuple[Dict[str, Future], Dict[str, Future]]:
+        """Split lines into those the caller now owns and those already in flight"""
+        owned = {}
+        waiting = {}
+        with self._lock:
+            for line in lines:
+                future = self._futures.get(line)
+                if future is None:
+                    future = self._futures[line] = Future()
+                    owned[line] = future
+                else:
+                    waiting[line] = future
+        return owned, waiting
+
+    def release(
+        self, owned: Dict[str, Future], results: Dict[str, Optional[str]]
+    ) -> None:
+        """Hand the results of owned lines to their waiters; safe to call twice"""
+        with self._lock:
+            for line, future in owned.items():
+                if self._futures.get(line) is future:
+                    del self._futures[line]
+        for line, future in owned.items():
+            if not future.done():
+                future.set_result(results.get(line))
+
+
+@st.cache_resource(show_spinner=False)
+def _inflight_lines() -> _InFlightLines:
+    """Lines being requested right now, shared across sessions"""
+    return _InFlightLines()
+
+
+class _LRUMemo:
+    """Small thread-safe least-recently-used map, optionally expiring entries"""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        max_chars: Optional[int] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Bound on the characters held in keys and values together
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        # key -> (value, time it was stored)
+        self._items: OrderedDict = OrderedDict()
+        self._chars = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, stored_at = item
+            if self.ttl is not None and time.monotonic() - stored_at >= self.ttl:
+                del self._items[key]
+                self._chars -= len(key) + len(value)
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._chars -= len(key) + len(old[0])
+            self._items[key] = (value, time.monotonic())
+            self._chars += len(key) + len(value)
+            while len(self._items) > self.maxsize or (
+                self.max_chars is not None and self._chars > self.max_chars
+            ):
+                old_key, (old_value, _) = self._items.popitem(last=False)
+                self._chars -= len(old_key) + len(old_value)
+
+
+# Whole-text results are held in a plain map rather than behind st.cache_*:
+# the request streams into page elements, and element calls made inside a
+# cached function are replayed on a hit, after those elements are gone
+@st.cache_resource(show_spinner=False)
+def _llm_memo() -> _LRUMemo:
+    """Recent Gemini results for whole texts, shared by all sessions"""
+    return _LRUMemo(LLM_MEMO_SIZE, ttl=LLM_MEMO_TTL, max_chars=LLM_MEMO_TOTAL_CHARS)
+
+
+def cached_llm_transliterate(
+    text: str, on_text: Optional[Callable[[str], None]] = None
+) -> Optional[str]:
+    """Cached LLM transliteration to avoid repeated API calls"""
+    memo = _llm_memo()
+    result = memo.get(text)
+    if result is None:
+        # Failed lookups are not stored, so the next submit tries again
+        result = llm_transliterate_internal(text, on_text)
+        if result is not None and len(text) <= LLM_MEMO_MAX_CHARS:
+            memo.put(text, result)
+    return result
+
+
+def _split_chunks(
+    lines: List[str],
+    max_chars: int = MAX_CHUNK_CHARS,
+    max_lines: int = MAX_CHUNK_LINES,
+) -> List[List[str]]:
+    """Group lines into chunks of at most max_chars characters and max_lines lines"""
+    chunks = []
+    current = []
+    size = 0
+    for line in lines:
+        if current and (size + len(line) > max_chars or len(current) >= max_lines):
+            chunks.append(current)
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Prompt optimized for Gemini 2.0 Flash Lite; only the task line varies per call
+_PROMPT_PREFIX = """You are an expert in Coptic language transliteration. Your task is to transliterate Coptic text to Latin script using standard transliteration conventions.
         
         Examples:
         - ⲡⲛⲟⲩⲧⲉ → pnoute
@@ -71,61 +458,301 @@ def llm_transliterate_internal(text: str) -> Optional[str]:
         - **Crucially: The output MUST contain ONLY plain, unaccented Latin characters (ASCII a-z). No Coptic characters, no diacritics, and no special Latin characters (e.g., ā, ē, ī, ō, ū) are allowed in the final transliterated text.**
         - Only return the transliterated text
 
-        Transliterate this Coptic text to Latin script: {text}"""
+        """
+_SINGLE_TASK = "Transliterate this Coptic text to Latin script: "
+_BATCH_TASK = (
+    "Transliterate each numbered line of Coptic text to Latin script. "
+    "Reply with exactly one line per number, keeping the numbering:\n"
+)
+# Preamble the model sometimes puts before its answer
+_RESPONSE_PREFIX = "transliteration:"
 
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {
-            "temperature": 0.1,
-            "maxOutputTokens": 2048,
-            "topP": 0.9,
-            "topK": 40,
-        },
-    }
 
+def _build_prompt(lines: List[str]) -> str:
+    """Build the Gemini prompt for one or more lines of Coptic text"""
+    if len(lines) == 1:
+        return _PROMPT_PREFIX + _SINGLE_TASK + lines[0]
+
+    numbered = "\n".join(f"{i}. {line}" for i, line in enumerate(lines, 1))
+    return _PROMPT_PREFIX + _BATCH_TASK + numbered
+
+
+def _extract_text(result: dict) -> Optional[str]:
+    """Pull the generated text out of a Gemini response"""
+    # The response shape is fixed, so index straight into the first part
     try:
-        request_url = f"{GEMINI_API_URL}?key={GEMINI_API_KEY}"
-        response = requests.post(request_url, headers=headers, json=payload, timeout=45)
+        return result["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _extract_finish_reason(result: dict) -> Optional[str]:
+    """Pull the finish reason out of a Gemini response event, if it has one"""
+    try:
+        return result["candidates"][0].get("finishReason")
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return None
+
+
+# Request body serialized once around a placeholder; per call only the prompt
+# string is encoded and spliced in
+_BODY_HEAD, _BODY_TAIL = orjson.dumps(
+    {
+        "contents": [{"parts": [{"text": "__PROMPT__"}]}],
+        "generationConfig": GENERATION_CONFIG,
+    }
+).split(b'"__PROMPT__"')
+
+
+class _RequestDropped(Exception):
+    """Raised when the local rate limiter turns a Gemini request away"""
+
+
+def _post_prompt(
+    session: requests.Session,
+    stats: _ApiStats,
+    limiter: _TokenBucket,
+    prompt: str,
+    on_text: Optional[Callable[[str], None]] = None,
+) -> Optional[str]:
+    """Send a prompt to Gemini; network, HTTP and rate limiter errors are raised"""
+    body = _BODY_HEAD + orjson.dumps(prompt) + _BODY_TAIL
+
+    # Hold back rather than fire a burst the API would answer with 429s
+    if not limiter.acquire(RATE_LIMIT_MAX_WAIT):
+        logger.warning("Gemini request dropped by the local rate limiter")
+        raise _RequestDropped()
+
+    # Stream the response as server-sent events so partial output can be shown
+    # while the rest is still being generated
+    with session.post(
+        GEMINI_STREAM_URL,
+        params={"alt": "sse"},
+        data=body,
+        stream=True,
+        timeout=45,
+    ) as response:
+        retries = response.raw.retries
+        if retries is not None and retries.history:
+            logger.info(f"Gemini request was retried {len(retries.history)} times")
+            stats.record_retries(len(retries.history))
         response.raise_for_status()
-        result = response.json()
-        logger.debug(f"API Response: {result}")
-
-        # Extract the generated text (specific to Gemini's response structure)
-        generated_text = None
-        if response.status_code == 200:
-            result = response.json()
-            if isinstance(result, dict) and "candidates" in result:
-                for candidate in result["candidates"]:
-                    if "content" in candidate and "parts" in candidate["content"]:
-                        for part in candidate["content"]["parts"]:
-                            if "text" in part:
-                                generated_text = part["text"]
-                                break
-                    if generated_text:
-                        break
-        else:
-            logger.error(
-                f"Gemini API request failed with status {response.status_code}: {response.text}"
-            )
+
+        # Events are parsed from the raw UTF-8 bytes; no str decoding pass
+        parts = []
+        finish_reason = None
+        for line in response.iter_lines():
+            if not line.startswith(b"data:"):
+                continue
+            result = orjson.loads(line[len(b"data:") :])
+            logger.debug(f"API Response: {result}")
+            finish_reason = _extract_finish_reason(result) or finish_reason
+            text = _extract_text(result)
+            if text:
+                parts.append(text)
+                if on_text:
+                    on_text("".join(parts))
+
+    # An answer cut off by the token limit or a safety stop would otherwise
+    # be cached as if it were complete
+    if finish_reason != "STOP":
+        logger.warning(f"Gemini answer incomplete (finish reason {finish_reason})")
+        return None
+
+    generated_text = "".join(parts)
+    if generated_text:
+        generated_text = generated_text.strip()
+
+        # remove unwanted prefixes like "Transliteration:"
+        if generated_text.lower().startswith(_RESPONSE_PREFIX):
+            generated_text = generated_text[len(_RESPONSE_PREFIX) :].strip()
+
+        return generated_text
+
+    return None
+
+
+_NUMBERED_LINE_RE = re.compile(r"^\s*(\d+)[.)]\s*(.*)$")
+_NUMBER_PREFIX_RE = re.compile(r"^\s*\d+[.)]\s*", re.MULTILINE)
+
+
+_LINE_BREAK_RE = re.compile(r"\s*\n\s*")
+
+
+def _single_line(text: Optional[str]) -> Optional[str]:
+    """Fold a per-line answer onto one line, so results stay aligned with input lines"""
+    return _LINE_BREAK_RE.sub(" ", text) if text else text
+
+
+def _parse_numbered_lines(text: str, count: int) -> Optional[List[str]]:
+    """Split a numbered batch response back into lines, or None if the shape is off"""
+    results = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        match = _NUMBERED_LINE_RE.match(line)
+        if not match or int(match.group(1)) != len(results) + 1:
             return None
+        results.append(match.group(2).strip())
+    return results if len(results) == count else None
+
+
+def _request_transliteration(
+    session: requests.Session,
+    stats: _ApiStats,
+    limiter: _TokenBucket,
+    lines: List[str],
+    on_text: Optional[Callable[[str], None]] = None,
+) -> List[Optional[str]]:
+    """Transliterate a chunk of lines, batching them into a single request"""
+    if len(lines) == 1:
+        response = _post_prompt(session, stats, limiter, _build_prompt(lines), on_text)
+        return [_single_line(response)]
+
+    show_batch = None
+    if on_text:
+
+        def show_batch(text: str):
+            # Hide the numbering the batch prompt asks for
+            on_text(_NUMBER_PREFIX_RE.sub("", text))
+
+    response = _post_prompt(session, stats, limiter, _build_prompt(lines), show_batch)
+    batch = _parse_numbered_lines(response, len(lines)) if response else None
+    if batch is not None:
+        return batch
+    logger.info("Batched response did not match the input lines; retrying per line")
+
+    # A single unanswered line already sinks the whole text, so stop there
+    results: List[Optional[str]] = [None] * len(lines)
+    for i, line in enumerate(lines):
+        results[i] = _single_line(
+            _post_prompt(session, stats, limiter, _build_prompt([line]))
+        )
+        if not results[i]:
+            break
+    return results
+
+
+def _request_chunks(
+    request_chunk: Callable[[List[str]], List[Optional[str]]],
+    chunks: List[List[str]],
+) -> List[List[Optional[str]]]:
+    """Request chunks concurrently, giving up on the rest once one comes back short"""
+    results: List[List[Optional[str]]] = [[None] * len(chunk) for chunk in chunks]
+    workers = min(len(chunks), MAX_CONCURRENT_REQUESTS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(request_chunk, chunk): i for i, chunk in enumerate(chunks)
+        }
+        try:
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                # A partial transliteration is thrown away anyway
+                if not all(results[futures[future]]):
+                    break
+        finally:
+            # Chunks that haven't started yet are never sent
+            for future in futures:
+                future.cancel()
+    return results
+
+
+def llm_transliterate_internal(
+    text: str, on_text: Optional[Callable[[str], None]] = None
+) -> Optional[str]:
+    """Internal function for LLM transliteration using Gemini 2.0 Flash"""
+    if not GEMINI_API_KEY:
+        return None
+
+    results = _llm_transliterate_lines(
+        [line.strip() for line in text.split("\n")], on_text
+    )
+    return None if results is None else "\n".join(results)
 
-        if generated_text:
-            generated_text = generated_text.strip()
 
-            # remove unwanted prefixes like "Transliteration:"
-            if generated_text.lower().startswith("transliteration:"):
-                generated_text = generated_text[len("transliteration:") :].strip()
+def _llm_transliterate_lines(
+    lines: List[str], on_text: Optional[Callable[[str], None]] = None
+) -> Optional[List[str]]:
+    """Transliterate stripped lines, one single-line result per input line"""
+    # Lines are cached individually on disk, so only unseen lines are sent
+    disk = _disk_cache()
+    keys = {line: f"{GEMINI_MODEL}:{_cache_key(line)}" for line in lines if line}
+    translated = {line: _single_line(disk.get(key)) for line, key in keys.items()}
+    missing = [line for line, result in translated.items() if result is None]
 
-            return generated_text
+    if not missing:
+        return [translated[line] if line else "" for line in lines]
 
+    # Fail fast while the endpoint is known to be down
+    breaker = _circuit_breaker()
+    if not breaker.allow_request():
+        st.warning(
+            "⏸️ AI service paused after repeated failures. Using rule-based transliteration."
+        )
         return None
 
+    request_chunk = partial(
+        _request_transliteration, _gemini_session(), _api_stats(), _rate_limiter()
+    )
+
+    # Lines another session is already requesting are waited on instead of
+    # being sent a second time
+    inflight = _inflight_lines()
+    owned, waiting = inflight.claim(missing)
+
+    # Missing lines are grouped into chunks that are requested concurrently;
+    # the calls are I/O-bound so threads overlap well.
+    chunks = _split_chunks(list(owned))
+
+    try:
+        if len(chunks) > MAX_CHUNKS_PER_TEXT:
+            st.info(
+                "ℹ️ Text too long for AI enhancement. Using rule-based transliteration."
+            )
+            return None
+
+        chunk_results = []
+        if len(chunks) == 1:
+            # Only a request made on the script thread can update the page
+            chunk_results = [request_chunk(chunks[0], on_text)]
+        elif chunks:
+            chunk_results = _request_chunks(request_chunk, chunks)
+
+        # Only an answered line shows the endpoint is back
+        if any(any(results) for results in chunk_results):
+            breaker.record_success()
+
+        for chunk, results in zip(chunks, chunk_results):
+            for line, result in zip(chunk, results):
+                if result:
+                    translated[line] = result
+                    disk.set(keys[line], result, expire=DISK_CACHE_EXPIRE)
+
+        # Publish before waiting, so two sessions can't end up waiting on
+        # each other's lines
+        inflight.release(owned, translated)
+        for line, future in waiting.items():
+            translated[line] = future.result(timeout=INFLIGHT_TIMEOUT)
+
+        # A partial transliteration is worse than none; fall back as a whole
+        if not all(translated.values()):
+            return None
+
+        return [translated[line] if line else "" for line in lines]
+
+    except _RequestDropped:
+        # Local back-off, not an endpoint failure
+        st.warning("🚦 AI service is busy. Using rule-based transliteration.")
+        return None
     except requests.exceptions.Timeout:
+        breaker.record_failure()
         st.warning(
             "⏱️ API request timed out. The model might be loading. Using rule-based transliteration."
         )
         return None
     except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 429 or e.response.status_code >= 500:
+            breaker.record_failure()
         if e.response.status_code == 429:
             st.warning("🔧 Rate limit exceeded. Using rule-based transliteration.")
         elif e.response.status_code == 503:
@@ -138,6 +765,7 @@ def llm_transliterate_internal(text: str) -> Optional[str]:
             )
         return None
     except requests.exceptions.RequestException as e:
+        breaker.record_failure()
         st.warning("🔌 Network issue. Using rule-based transliteration.")
         logger.error(f"Request error: {e}")
         return None
@@ -145,16 +773,70 @@ def llm_transliterate_internal(text: str) -> Optional[str]:
         st.warning("⚠️ Using rule-based transliteration due to API issues.")
         logger.error(f"Unexpected error: {e}")
         return None
-
-
-def llm_transliterate(text: str) -> Optional[str]:
-    """Public function for LLM transliteration with caching"""
-    if not text or not text.strip():
+    finally:
+        # Waiters get None for lines whose request failed
+        inflight.release(owned, translated)
+        breaker.release_trial()
+
+
+# Zero-width characters that often come along with copied Coptic text
+_ZERO_WIDTH_MAP = str.maketrans("", "", "\u200b\u200c\u200d\u2060\ufeff")
+# Combining mark blocks seen in Coptic text (incl. the supralinear stroke)
+_COMBINING_RE = re.compile(
+    "[\u0300-\u036f\u0483-\u0489\u1ab0-\u1aff\u1dc0-\u1dff"
+    "\u20d0-\u20ff\u2cef-\u2cf1\ufe20-\ufe2f]"
+)
+_SPACES_RE = re.compile(r"[^\S\n]+")
+_LINE_EDGE_RE = re.compile(r" ?\n ?")
+
+
+def _canonical_text(text: str) -> str:
+    """Canonical form of the input, used both as the cache key and for the API call"""
+    # The model is asked for lowercase, unaccented output, so case and
+    # combining marks don't change the answer
+    text = unicodedata.normalize("NFD", text).translate(_ZERO_WIDTH_MAP)
+    text = _COMBINING_RE.sub("", text).lower()
+    text = _SPACES_RE.sub(" ", text).strip()
+    return _LINE_EDGE_RE.sub("\n", text)
+
+
+# Inputs shorter than this are left to the rule-based transliterator
+MIN_LLM_CHARS = 6
+# Coptic block plus the Coptic letters in the Greek block; input without any
+# of these (e.g. already-Latin text) has nothing for the model to do
+_COPTIC_RE = re.compile("[\u03e2-\u03ef\u2c80-\u2cff]")
+# Validated transliterations (the prompt examples), answered without a request
+_KNOWN_GOOD = {
+    "ⲡⲛⲟⲩⲧⲉ": "pnoute",
+    "ⲧⲉⲕⲕⲗⲏⲥⲓⲁ": "tekklesia",
+    "ⲁⲅⲁⲡⲏ": "agape",
+    "ⲙⲁⲣⲓⲁ": "maria",
+}
+
+
+def _needs_llm(canonical: str) -> bool:
+    """Whether canonical text is long enough and Coptic enough for a Gemini request"""
+    return len(canonical) >= MIN_LLM_CHARS and _COPTIC_RE.search(canonical) is not None
+
+
+def _skips_llm(canonical: str) -> bool:
+    """Whether canonical text isn't worth a Gemini request"""
+    return canonical not in _KNOWN_GOOD and not _needs_llm(canonical)
+
+
+def llm_transliterate(
+    canonical: str, on_text: Optional[Callable[[str], None]] = None
+) -> Optional[str]:
+    """Public function for LLM transliteration with caching; expects canonical text"""
+    # Canonical text lets inputs that differ only in whitespace, case or
+    # diacritics share a cache entry; the caller canonicalizes once and
+    # reuses it for _skips_llm
+    if canonical in _KNOWN_GOOD:
+        return _KNOWN_GOOD[canonical]
+    if not _needs_llm(canonical):
         return None
 
-    # Create hash for caching
-    text_hash = hashlib.md5(text.encode()).hexdigest()
-    return cached_llm_transliterate(text_hash, text)
+    return cached_llm_transliterate(canonical, on_text)
 
 
 # Page configuration
@@ -165,464 +847,181 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# CSS styling
-st.markdown(
-    """
-<style>
-    /* Global dark theme settings */
-    .stApp {
-        background-color: #0e1117;
-        color: #ffffff;
-    }
-    
-    /* Main header styling */
-    .main-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 2rem;
-        border-radius: 15px;
-        color: white;
-        margin-bottom: 2rem;
-        text-align: center;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-    }
-    
-    .main-header h1 {
-        margin: 0;
-        font-size: 2.5rem;
-        font-weight: 700;
-    }
-    
-    .main-header p {
-        margin: 0.5rem 0 0 0;
-        font-size: 1.2rem;
-        opacity: 0.9;
-    }
-    
-    /* Info boxes with dark theme visibility */
-    .info-box {
-        background: linear-gradient(135deg, #262730 0%, #1e1e2e 100%);
-        padding: 1.5rem;
-        border-radius: 12px;
-        border-left: 5px solid #667eea;
-        margin: 1rem 0;
-        color: #ffffff;
-        box-shadow: 0 2px 10px rgba(0,0,0,0.3);
-    }
-    
-    .info-box h4 {
-        color: #ffffff;
-        margin-top: 0;
-        font-weight: 600;
-    }
-    
-    .info-box ul {
-        margin-bottom: 0;
-    }
-    
-    .info-box li {
-        margin: 0.5rem 0;
-        color: #ffffff;
-    }
-    
-    /* Result box styling */
-    .result-info {
-        background: linear-gradient(135deg, #1a4d2e 0%, #0f3320 100%);
-        padding: 1.5rem;
-        border-radius: 12px;
-        border: 2px solid #28a745;
-        margin: 1rem 0;
-        color: #ffffff;
-        box-shadow: 0 2px 10px rgba(40, 167, 69, 0.2);
-    }
-    
-    .result-info strong {
-        color: #ffffff;
-    }
-    
-    /* Results section styling */
-    .results-container {
-        background: linear-gradient(135deg, #2a2d3a 0%, #1f2029 100%);
-        padding: 2rem;
-        border-radius: 15px;
-        border: 2px solid #667eea;
-        margin: 2rem 0;
-        box-shadow: 0 4px 20px rgba(102, 126, 234, 0.2);
-    }
-    
-    .method-header {
-        color: #ffffff;
-        font-size: 1.2rem;
-        font-weight: 600;
-        margin-bottom: 1rem;
-        padding: 0.5rem 1rem;
-        border-radius: 8px;
-        text-align: center;
-    }
-    
-    .rule-based-header {
-        background: linear-gradient(135deg, #4a5568 0%, #2d3748 100%);
-        border: 1px solid #718096;
-    }
-    
-    .ai-enhanced-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border: 1px solid #667eea;
-    }
-    
-    /* Text area */
-    .stTextArea textarea {
-        background-color: #1a1a2e !important;
-        border: 2px solid #404040 !important;
-        border-radius: 8px !important;
-        color: #ffffff !important;
-        font-size: 16px !important;
-        line-height: 1.6 !important;
-        font-family: 'Consolas', 'Monaco', 'Courier New', monospace !important;
-    }
-    
-    .stTextArea textarea:focus {
-        border-color: #667eea !important;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.2) !important;
-        outline: none !important;
-    }
-    
-    .stTextArea textarea::placeholder {
-        color: #888888 !important;
-        opacity: 0.8 !important;
-    }
-    
-    .stTextArea textarea[disabled] {
-        background-color: #2d3748 !important;
-        border-color: #4a5568 !important;
-        color: #f7fafc !important;
-        opacity: 1 !important;
-        font-weight: 600 !important;
-        font-size: 18px !important;
-        line-height: 1.7 !important;
-        text-shadow: 0 0 1px rgba(255,255,255,0.5) !important;
-    }
-    
-    /* File uploader styling */
-    .stFileUploader > div {
-        background-color: #262730 !important;
-        border: 2px dashed #404040 !important;
-        border-radius: 8px !important;
-        color: #ffffff !important;
-    }
-    
-    .stFileUploader label {
-        color: #ffffff !important;
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 8px !important;
-        padding: 0.5rem 1rem !important;
-        font-weight: 500 !important;
-        transition: transform 0.2s ease !important;
-        min-height: 44px !important;
-        white-space: normal !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: center !important;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4) !important;
-    }
-    
-    /* Ensure button containers are visible */
-    .stButton {
-        display: block !important;
-        width: 100% !important;
-    }
-    
-    /* Download button specific styling */
-    .stDownloadButton > button {
-        background: linear-gradient(135deg, #28a745 0%, #20c997 100%) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 8px !important;
-    }
-    
-    .stDownloadButton > button:hover {
-        background: linear-gradient(135deg, #218838 0%, #1e9a7e 100%) !important;
-        transform: translateY(-2px) !important;
-    }
-    
-    /* Section headers - FIXED */
-    .section-header {
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-        background-clip: text;
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-size: 1.8rem;
-        font-weight: 700;
-        margin: 2rem 0 1rem 0;
-        display: block !important;
-        visibility: visible !important;
-    }
-    
-    /* Ensure columns are visible */
-    .stColumn {
-        color: #ffffff !important;
-        display: block !important;
-        visibility: visible !important;
-    }
-    
-    /* Footer styling */
-    .footer-box {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 2rem;
-        border-radius: 15px;
-        color: white;
-        text-align: center;
-        margin: 2rem 0;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-    }
-    
-    .footer-box h3 {
-        margin-top: 0;
-    }
-    
-    /* Sidebar */
-    .css-1d391kg {
-        background-color: #1a1a2e !important;
-    }
-    
-    /* Progress bar styling */
-    .stProgress > div > div {
-        background-color: #667eea !important;
-    }
-    
-    /* Expander styling */
-    .streamlit-expander {
-        background-color: #262730 !important;
-        border: 1px solid #404040 !important;
-        border-radius: 8px !important;
-    }
-    
-    .streamlit-expander .streamlit-expanderHeader {
-        background-color: #262730 !important;
-        color: #ffffff !important;
-    }
-    
-    .streamlit-expander .streamlit-expanderContent {
-        background-color: #1a1a2e !important;
-        color: #ffffff !important;
-    }
-    
-    /* Metric styling for sidebar */
-    .metric-container {
-        background-color: #262730 !important;
-        padding: 1rem !important;
-        border-radius: 8px !important;
-        border: 1px solid #404040 !important;
-    }
-    
-    /* Alert/warning boxes */
-    .stAlert {
-        background-color: #262730 !important;
-        border: 1px solid #404040 !important;
-        color: #ffffff !important;
-    }
-    
-    /* Success message styling */
-    .stSuccess {
-        background-color: #1a4d2e !important;
-        border: 1px solid #28a745 !important;
-        color: #ffffff !important;
-    }
-    
-    /* Warning message styling */
-    .stWarning {
-        background-color: #4d3319 !important;
-        border: 1px solid #ffc107 !important;
-        color: #ffffff !important;
-    }
-    
-    /* Info message styling */
-    .stInfo {
-        background-color: #1a2a4d !important;
-        border: 1px solid #17a2b8 !important;
-        color: #ffffff !important;
-    }
-    
-    /* Error message styling */
-    .stError {
-        background-color: #4d1a1a !important;
-        border: 1px solid #dc3545 !important;
-        color: #ffffff !important;
-    }
-    
-    /* General text */
-    h1, h2, h3, h4, h5, h6 {
-        color: #ffffff !important;
-        display: block !important;
-        visibility: visible !important;
-    }
-    
-    p, li, span {
-        color: #ffffff !important;
-    }
-    
-    /* Markdown content styling */
-    .stMarkdown {
-        color: #ffffff !important;
-        display: block !important;
-        visibility: visible !important;
-    }
-    
-    .stMarkdown h1, .stMarkdown h2, .stMarkdown h3, .stMarkdown h4, .stMarkdown h5, .stMarkdown h6 {
-        color: #ffffff !important;
-        display: block !important;
-        visibility: visible !important;
-    }
-    
-    /* labels visiblilty */
-    label {
-        color: #ffffff !important;
-    }
-    
-    /* Help text styling */
-    .stTextInput > div > div > input + div {
-        color: #888888 !important;
-    }
-    
-    /* Download section styling */
-    .download-section {
-        background: linear-gradient(135deg, #1e3a8a 0%, #1e40af 100%);
-        padding: 1.5rem;
-        border-radius: 12px;
-        margin: 1rem 0;
-        border: 1px solid #3b82f6;
-    }
-    
-    .download-section h4 {
-        color: #ffffff;
-        margin-top: 0;
-        margin-bottom: 1rem;
-    }
-    
-    /* Ensure all main containers are visible */
-    div[data-testid="stVerticalBlock"] {
-        display: block !important;
-        visibility: visible !important;
-    }
-    
-    div[data-testid="column"] {
-        display: block !important;
-        visibility: visible !important;
-    }
-    
-    /* Make sure button containers are always visible */
-    div[data-testid="stHorizontalBlock"] {
-        display: flex !important;
-        visibility: visible !important;
-    }
-</style>
-""",
-    unsafe_allow_html=True,
-)
 
-with st.sidebar:
-    st.markdown(
-        """
-    [![GitHub](https://img.shields.io/badge/GitHub-Repository-blue?logo=github)](https://github.com/shehatamichael/coptic-transliterator-llm)
-    """
-    )
+@st.cache_resource(show_spinner=False)
+def _rule_memo() -> _LRUMemo:
+    """Recent rule-based results, looked up on the script thread"""
+    return _LRUMemo(RULE_MEMO_SIZE, max_chars=RULE_MEMO_TOTAL_CHARS)
 
-    st.markdown("---")
 
-    st.markdown(
-        """
-    ### 🤝 Contribute
-    - [Report Issues](https://github.com/shehatamichael/coptic-transliterator-llm/issues)
-    - [Submit Pull Requests](https://github.com/shehatamichael/coptic-transliterator-llm/pulls)
-    - [Fork the Project](https://github.com/shehatamichael/coptic-transliterator-llm/fork)
-    """
+@st.cache_resource(show_spinner=False)
+def _rule_executor() -> ThreadPoolExecutor:
+    """Worker threads for the rule-based pass, reused across reruns and sessions"""
+    return ThreadPoolExecutor(
+        max_workers=RULE_WORKERS, thread_name_prefix="rule-translit"
     )
 
-    st.markdown("---")
+
+@st.cache_resource(show_spinner=False)
+def _warmup() -> bool:
+    """Pay one-off start-up costs once per process instead of on the first click"""
+    # The rule-based tables and regexes are already built when transliterator
+    # is imported; only the HTTP session is left to set up
+    if GEMINI_API_KEY:
+        _gemini_session()
+    return True
+
+
+_warmup()
+
+
+# The stylesheet is re-sent on every rerun, so comments and layout whitespace
+# are stripped from it first
+THEME_CSS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "assets", "theme.css"
+)
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_SPACE_RE = re.compile(r"\s*([{};,>])\s*|(:)\s+|\s+")
+
+
+# Static page fragments, built once and shared by every session and rerun
+@st.cache_resource(show_spinner=False)
+def _css() -> str:
+    """Global stylesheet for the app, minified once per process"""
+    with open(THEME_CSS_PATH, encoding="utf-8") as f:
+        css = _CSS_COMMENT_RE.sub("", f.read())
+    css = _CSS_SPACE_RE.sub(lambda m: m.group(1) or m.group(2) or " ", css)
+    return f"<style>{css.strip()}</style>"
+
+
+@st.cache_resource(show_spinner=False)
+def _sidebar_links_markdown() -> str:
+    """Repository badge and contribution links at the top of the sidebar"""
+    return """
+[![GitHub](https://img.shields.io/badge/GitHub-Repository-blue?logo=github)](https://github.com/shehatamichael/coptic-transliterator-llm)
+
+---
+
+### 🤝 Contribute
+- [Report Issues](https://github.com/shehatamichael/coptic-transliterator-llm/issues)
+- [Submit Pull Requests](https://github.com/shehatamichael/coptic-transliterator-llm/pulls)
+- [Fork the Project](https://github.com/shehatamichael/coptic-transliterator-llm/fork)
+
+---
+
+### 🔌 AI Model Status
+"""
+
+
+@st.cache_resource(show_spinner=False)
+def _sidebar_about_html() -> str:
+    """How-it-works, features and contact sections at the bottom of the sidebar"""
+    return """
+---
+
+### ℹ️ How It Works
+
+<div class="info-box">
+    <h4>Two-Method Comparison:</h4>
+    <strong>1️⃣ Rule-based</strong> transliteration (fast, consistent)<br>
+    <strong>2️⃣ AI enhancement</strong> with Gemini 2.0 Flash Lite (context-aware improvements)<br><br>
+    <strong>📊 Side-by-side results</strong> let you compare both methods!
+</div>
+
+### 🎯 Features
+
+<div class="info-box">
+    <ul>
+        <li>✅ Handles complex Coptic characters</li>
+        <li>✨ Advanced AI with Gemini 2.0 Flash Lite</li>
+        <li>📊 Method comparison view</li>
+        <li>📱 Mobile-friendly interface</li>
+        <li>⬇️ Download results</li>
+        <li>🆓 Completely free to use</li>
+    </ul>
+</div>
+
+---
+
+### 📧 Contact
+**Michael Shehata**  
+📧 shehatam.dev@gmail.com
+
+### ⭐ Support
+If this tool helps you, consider giving it a star on GitHub!
+"""
+
+
+@st.cache_resource(show_spinner=False)
+def _header_html() -> str:
+    """Banner shown at the top of the page"""
+    return """
+<div class="main-header">
+    <h1>📱 Coptic Transliteration Tool</h1>
+    <p>AI-enhanced transliteration with Gemini 2.0 Flash Lite for Coptic text to Latin script</p>
+</div>
+"""
+
+
+@st.cache_resource(show_spinner=False)
+def _footer_html() -> str:
+    """Open source footer shown below the instructions"""
+    return """
+<div class="footer-box">
+    <h3>🛠️ Open Source & Free Forever</h3>
+    <p style="font-size: 1.1em; margin: 15px 0;">
+        This tool is completely open source and will always be free to use!
+    </p>
+    <p>
+        <a href="https://github.com/shehatamichael/coptic-transliterator-llm" target="_blank" 
+           style="text-decoration: none; color: white;">
+            <img src="https://img.shields.io/badge/⭐_Star_on_GitHub-white?style=for-the-badge&logo=github&logoColor=black" 
+                 alt="Star on GitHub">
+        </a>
+    </p>
+    <p style="margin-top: 20px; font-size: 1.1em;">
+        <strong>Made with ❤️ for the Coptic community</strong>
+    </p>
+    <p style="font-style: italic; opacity: 0.9;">
+        Preserving ancient language through modern technology
+    </p>
+</div>
+"""
+
+
+# CSS styling
+st.markdown(_css(), unsafe_allow_html=True)
+
+# The sidebar's static sections are sent as a few large markdown blocks
+with st.sidebar:
+    st.markdown(_sidebar_links_markdown())
 
     # API Status indicator with debugging
-    st.markdown("### 🔌 AI Model Status")
     if GEMINI_API_KEY:
         st.success("✅ AI Enhancement Available")
         st.info("Using Gemini 2.0 Flash Lite for superior accuracy")
+        breaker_state = _circuit_breaker().state
+        if breaker_state == _CircuitBreaker.OPEN:
+            st.warning("⏸️ AI calls paused after repeated failures")
+        st.caption(
+            f"🔁 API retries since startup: {_api_stats().retries} · Circuit: {breaker_state}"
+        )
 
     else:
         st.warning("⚠️ Rule-based Mode Only")
         st.info("Set GEMINI_API_KEY for AI enhancement")
 
-    st.markdown("---")
-
     # Usage statistics
     if "transliteration_count" not in st.session_state:
         st.session_state.transliteration_count = 0
 
-    st.markdown(f"### 📊 Session Stats")
+    st.markdown("---\n\n### 📊 Session Stats")
     st.metric("Transliterations", st.session_state.transliteration_count)
 
-    st.markdown("---")
-
-    st.markdown("### ℹ️ How It Works")
-    st.markdown(
-        """
-    <div class="info-box">
-        <h4>Two-Method Comparison:</h4>
-        <strong>1️⃣ Rule-based</strong> transliteration (fast, consistent)<br>
-        <strong>2️⃣ AI enhancement</strong> with Gemini 2.0 Flash Lite (context-aware improvements)<br><br>
-        <strong>📊 Side-by-side results</strong> let you compare both methods!
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-    st.markdown("### 🎯 Features")
-    st.markdown(
-        """
-    <div class="info-box">
-        <ul>
-            <li>✅ Handles complex Coptic characters</li>
-            <li>✨ Advanced AI with Gemini 2.0 Flash Lite</li>
-            <li>📊 Method comparison view</li>
-            <li>📱 Mobile-friendly interface</li>
-            <li>⬇️ Download results</li>
-            <li>🆓 Completely free to use</li>
-        </ul>
-    </div>
-    """,
-        unsafe_allow_html=True,
-    )
-
-    st.markdown("---")
-
-    st.markdown(
-        """
-    ### 📧 Contact
-    **Michael Shehata**  
-    📧 shehatam.dev@gmail.com
-    
-    ### ⭐ Support
-    If this tool helps you, consider giving it a star on GitHub!
-    """
-    )
+    st.markdown(_sidebar_about_html(), unsafe_allow_html=True)
 
 # Main header
-st.markdown(
-    """
-<div class="main-header">
-    <h1>📱 Coptic Transliteration Tool</h1>
-    <p>AI-enhanced transliteration with Gemini 2.0 Flash Lite for Coptic text to Latin script</p>
-</div>
-""",
-    unsafe_allow_html=True,
-)
+st.markdown(_header_html(), unsafe_allow_html=True)
 
 # Initialize session state for input text
 if "input_text" not in st.session_state:
@@ -632,23 +1031,10 @@ if "input_text" not in st.session_state:
 st.markdown("#### ✨ Try These Examples")
 st.markdown("---")
 
-# Force visibility for this section
-st.markdown(
-    '<div style="display: block !important; visibility: visible !important;">',
-    unsafe_allow_html=True,
-)
-
-col1, col2, col3 = st.columns(3)
-
 example_texts = [("ⲡⲛⲟⲩⲧⲉ", "God"), ("ⲧⲉⲕⲕⲗⲏⲥⲓⲁ", "Church"), ("ⲁⲅⲁⲡⲏ", "Love")]
 
-for i, (coptic, english) in enumerate(example_texts):
-    with [col1, col2, col3][i]:
-        button_html = f"""
-        <div style="display: block !important; visibility: visible !important; margin-bottom: 1rem;">
-        """
-        st.markdown(button_html, unsafe_allow_html=True)
-
+for i, (column, (coptic, english)) in enumerate(zip(st.columns(3), example_texts)):
+    with column:
         if st.button(
             f"{coptic}\n({english})",
             key=f"example_{i}",
@@ -658,278 +1044,306 @@ for i, (coptic, english) in enumerate(example_texts):
             st.session_state.input_text = coptic
             st.rerun()  # Force a rerun to update the input field
 
-        st.markdown("</div>", unsafe_allow_html=True)
-
-st.markdown("</div>", unsafe_allow_html=True)  # Close the forced visibility div
-
 # MAIN INTERFACE
 st.markdown("---")
 st.markdown("#### 🔄 Transliteration Interface")
 st.markdown("---")
 
-# Create two main columns: Input (left) and Results (right)
-main_col1, main_col2 = st.columns([1, 1])
-
-with main_col1:
-    st.markdown("##### 📝 Input")
-
-    # Text input with session state management
-    input_text = st.text_area(
-        "Enter Coptic Text",
-        height=200,
-        placeholder="Paste your Coptic text here or click an example above...",
-        value=st.session_state.input_text,
-        help="You can type or paste Coptic Unicode text here",
-        key="text_input",
-    )
 
-    # Update session state when text changes
-    if input_text != st.session_state.input_text:
-        st.session_state.input_text = input_text
+@st.fragment
+def _transliteration_interface() -> None:
+    """Input and results columns; their widgets rerun only this fragment"""
+    # Create two main columns: Input (left) and Results (right)
+    main_col1, main_col2 = st.columns([1, 1])
 
-    # File uploader
-    uploaded_file = st.file_uploader(
-        "Or Upload a Text File",
-        type="txt",
-        help="Upload a .txt file containing Coptic text",
-    )
+    with main_col1:
+        st.markdown("##### 📝 Input")
 
-    # Transliteration button
-    if st.button("🚀 Transliterate Text", type="primary", use_container_width=True):
-        processing_text = ""
-
-        # Check for input text from text area
-        if input_text and input_text.strip():
-            processing_text = input_text.strip()
-        # Check for uploaded file
-        elif uploaded_file:
-            try:
-                processing_text = uploaded_file.read().decode("utf-8").strip()
-            except Exception as e:
-                st.error(
-                    "❌ Error reading file. Please ensure it's a valid UTF-8 text file."
-                )
+        # Text input with session state management
+        input_text = st.text_area(
+            "Enter Coptic Text",
+            height=200,
+            placeholder="Paste your Coptic text here or click an example above...",
+            value=st.session_state.input_text,
+            help="You can type or paste Coptic Unicode text here",
+            key="text_input",
+        )
 
-        if processing_text:
-            # Create progress indicator
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+        # Update session state when text changes
+        if input_text != st.session_state.input_text:
+            st.session_state.input_text = input_text
 
-            status_text.text("🔄 Starting transliteration...")
-            progress_bar.progress(25)
+        # File uploader
+        uploaded_file = st.file_uploader(
+            "Or Upload a Text File",
+            type="txt",
+            help="Upload a .txt file containing Coptic text",
+        )
 
-            try:
-                # Rule-based transliteration (always works)
-                status_text.text("📝 Applying rule-based transliteration...")
-                progress_bar.progress(50)
+        # Transliteration button
+        if st.button("🚀 Transliterate Text", type="primary", use_container_width=True):
+            processing_text = ""
+
+            # Check for input text from text area
+            if input_text and input_text.strip():
+                processing_text = input_text.strip()
+            # Check for uploaded file
+            elif uploaded_file:
+                try:
+                    # Decode straight from the upload's buffer instead of copying
+                    # the whole file into a bytes object first
+                    with uploaded_file.getbuffer() as buffer:
+                        processing_text = str(buffer, "utf-8").strip()
+                except Exception as e:
+                    st.error(
+                        "❌ Error reading file. Please ensure it's a valid UTF-8 text file."
+                    )
 
-                rule_based_output = translit(processing_text)
+            if processing_text:
+                # Collapsible status, holding a live preview of the streamed AI output
+                status = st.status(
+                    "📝 Applying rule-based transliteration...", expanded=False
+                )
+                preview = status.empty()
+
+                try:
+                    # The rule-based pass (always works) runs on a worker thread
+                    # while the script thread waits on the Gemini request
+                    # Resubmitting the same text reuses the earlier result
+                    rule_memo = _rule_memo()
+                    rule_based_output = rule_memo.get(processing_text)
+                    rule_future = None
+                    if rule_based_output is None:
+                        rule_future = _rule_executor().submit(translit, processing_text)
+
+                    # AI enhancement (if available and worth a request)
+                    llm_output = None
+                    canonical = (
+                        _canonical_text(processing_text) if GEMINI_API_KEY else ""
+                    )
+                    use_llm = GEMINI_API_KEY and not _skips_llm(canonical)
+                    if use_llm:
+                        status.update(
+                            label="✨ Enhancing with Gemini 2.0 Flash Lite...",
+                            expanded=True,
+                        )
 
-                # AI enhancement (if available)
-                llm_output = None
-                if GEMINI_API_KEY:
-                    status_text.text("✨ Enhancing with Gemini 2.0 Flash Lite...")
-                    progress_bar.progress(75)
+                        llm_output = llm_transliterate(canonical, preview.text)
+                        preview.empty()
 
-                    llm_output = llm_transliterate(processing_text)
+                    if rule_future is not None:
+                        rule_based_output = rule_future.result()
+                        if len(processing_text) <= RULE_MEMO_MAX_CHARS:
+                            rule_memo.put(processing_text, rule_based_output)
 
-                    # Debug information
-                    if llm_output:
-                        st.success("✅ AI enhancement successful!")
+                    if GEMINI_API_KEY and not use_llm:
+                        st.info(
+                            "ℹ️ AI enhancement isn't needed for this input, showing rule-based result in both columns"
+                        )
+                        llm_output = rule_based_output
+                    elif GEMINI_API_KEY:
+                        # Debug information
+                        if llm_output:
+                            st.success("✅ AI enhancement successful!")
+                        else:
+                            st.info(
+                                "ℹ️ AI enhancement unavailable (model may be loading), showing rule-based result in both columns"
+                            )
+                            llm_output = (
+                                rule_based_output  # Fallback to rule-based for display
+                            )
                     else:
                         st.info(
-                            "ℹ️ AI enhancement unavailable (model may be loading), showing rule-based result in both columns"
+                            "ℹ️ API key not configured, showing rule-based result in both columns"
                         )
                         llm_output = (
                             rule_based_output  # Fallback to rule-based for display
                         )
-                else:
-                    st.info(
-                        "ℹ️ API key not configured, showing rule-based result in both columns"
+
+                    # Update session stats
+                    st.session_state.transliteration_count += 1
+
+                    # Store results in session state to display them in the right column
+                    st.session_state.results = {
+                        "rule_based": rule_based_output,
+                        "llm_output": llm_output,
+                        "processing_text": processing_text,
+                        "has_results": True,
+                    }
+
+                    status.update(
+                        label="✅ Transliteration completed!",
+                        state="complete",
+                        expanded=False,
                     )
-                    llm_output = rule_based_output  # Fallback to rule-based for display
-
-                progress_bar.progress(100)
-                status_text.text("✅ Transliteration completed!")
-
-                # Update session stats
-                st.session_state.transliteration_count += 1
-
-                # Store results in session state to display them in the right column
-                st.session_state.results = {
-                    "rule_based": rule_based_output,
-                    "llm_output": llm_output,
-                    "processing_text": processing_text,
-                    "has_results": True,
-                }
-
-                # Clear progress indicators
-                time.sleep(1)
-                progress_bar.empty()
-                status_text.empty()
-
-            except Exception as e:
-                progress_bar.empty()
-                status_text.empty()
-                st.error(
-                    f"❌ An error occurred during transliteration. Please try again."
-                )
-                st.error(f"Error details: {str(e)}")
 
-        else:
-            st.warning("⚠️ Please provide input text or upload a file.")
+                except Exception as e:
+                    preview.empty()
+                    status.update(
+                        label="❌ Transliteration failed", state="error", expanded=False
+                    )
+                    st.error(
+                        f"❌ An error occurred during transliteration. Please try again."
+                    )
+                    st.error(f"Error details: {str(e)}")
 
-with main_col2:
-    st.markdown("##### 📊 Results")
+            else:
+                st.warning("⚠️ Please provide input text or upload a file.")
 
-    # Display results if they exist
-    if "results" in st.session_state and st.session_state.results.get(
-        "has_results", False
-    ):
-        # Method information
-        rule_based_output = st.session_state.results["rule_based"]
-        llm_output = st.session_state.results["llm_output"]
-        processing_text = st.session_state.results["processing_text"]
-
-        ai_status = (
-            "Gemini 2.0 Flash Lite Enhanced"
-            if GEMINI_API_KEY and llm_output != rule_based_output
-            else "Rule-based (Fallback)"
-        )
-        st.markdown(
-            f"""
-        <div class="result-info">
-            <strong>Input Length:</strong> {len(processing_text)} characters<br>
-            <strong>Rule-based Output:</strong> {len(rule_based_output)} characters<br>
-            <strong>AI-Enhanced Output:</strong> {len(llm_output)} characters<br>
-            <strong>AI Model:</strong> {ai_status}
-        </div>
-        """,
-            unsafe_allow_html=True,
-        )
+    with main_col2:
+        st.markdown("##### 📊 Results")
 
-        # Rule-based result
-        st.markdown(
-            '<div class="method-header rule-based-header">📝 Rule-based Method</div>',
-            unsafe_allow_html=True,
-        )
-        st.text_area(
-            "Rule-based Transliteration",
-            value=(
-                rule_based_output
-                if rule_based_output
-                else "Results will appear here after transliteration"
-            ),
-            height=100,
-            disabled=True,
-            key="rule_result_display",
-            help="Fast, consistent transliteration based on linguistic rules",
-            label_visibility="collapsed",
-        )
+        # Display results if they exist
+        if "results" in st.session_state and st.session_state.results.get(
+            "has_results", False
+        ):
+            # Method information
+            rule_based_output = st.session_state.results["rule_based"]
+            llm_output = st.session_state.results["llm_output"]
+            processing_text = st.session_state.results["processing_text"]
+
+            ai_status = (
+                "Gemini 2.0 Flash Lite Enhanced"
+                if GEMINI_API_KEY and llm_output != rule_based_output
+                else "Rule-based (Fallback)"
+            )
+            st.markdown(
+                f"""
+            <div class="result-info">
+                <strong>Input Length:</strong> {len(processing_text)} characters<br>
+                <strong>Rule-based Output:</strong> {len(rule_based_output)} characters<br>
+                <strong>AI-Enhanced Output:</strong> {len(llm_output)} characters<br>
+                <strong>AI Model:</strong> {ai_status}
+            </div>
+            """,
+                unsafe_allow_html=True,
+            )
 
-        # AI-enhanced result
-        st.markdown(
-            '<div class="method-header ai-enhanced-header">✨ Gemini 2.0 Flash Lite Enhanced</div>',
-            unsafe_allow_html=True,
-        )
-        st.text_area(
-            "AI-Enhanced Transliteration",
-            value=(
-                llm_output
-                if llm_output
-                else "Results will appear here after transliteration"
-            ),
-            height=100,
-            disabled=True,
-            key="ai_result_display",
-            help="Context-aware improvements using Meta Gemini 2.0 Flash Lite model",
-            label_visibility="collapsed",
-        )
+            # Rule-based result
+            st.markdown(
+                '<div class="method-header rule-based-header">📝 Rule-based Method</div>',
+                unsafe_allow_html=True,
+            )
+            st.text_area(
+                "Rule-based Transliteration",
+                value=(
+                    rule_based_output
+                    if rule_based_output
+                    else "Results will appear here after transliteration"
+                ),
+                height=100,
+                disabled=True,
+                key="rule_result_display",
+                help="Fast, consistent transliteration based on linguistic rules",
+                label_visibility="collapsed",
+            )
 
-        # Download section
-        st.markdown("#### ⬇️ Download Results")
+            # AI-enhanced result
+            st.markdown(
+                '<div class="method-header ai-enhanced-header">✨ Gemini 2.0 Flash Lite Enhanced</div>',
+                unsafe_allow_html=True,
+            )
+            st.text_area(
+                "AI-Enhanced Transliteration",
+                value=(
+                    llm_output
+                    if llm_output
+                    else "Results will appear here after transliteration"
+                ),
+                height=100,
+                disabled=True,
+                key="ai_result_display",
+                help="Context-aware improvements using Meta Gemini 2.0 Flash Lite model",
+                label_visibility="collapsed",
+            )
 
-        col1, col2, col3 = st.columns(3)
+            # Download section
+            st.markdown("#### ⬇️ Download Results")
 
-        with col1:
-            st.download_button(
-                label="📝 Rule-based",
-                data=rule_based_output,
-                file_name=f"rule_based_{int(time.time())}.txt",
-                mime="text/plain",
-                use_container_width=True,
-                help="Download the rule-based transliteration",
-            )
+            col1, col2, col3 = st.columns(3)
 
-        with col2:
-            st.download_button(
-                label="✨ Gemini Enhanced",
-                data=llm_output,
-                file_name=f"gemini_enhanced_{int(time.time())}.txt",
-                mime="text/plain",
-                use_container_width=True,
-                help="Download the Gemini 2.0 Flash Lite enhanced transliteration",
-            )
+            with col1:
+                st.download_button(
+                    label="📝 Rule-based",
+                    data=rule_based_output,
+                    file_name=f"rule_based_{int(time.time())}.txt",
+                    mime="text/plain",
+                    use_container_width=True,
+                    help="Download the rule-based transliteration",
+                )
 
-        with col3:
-            # Combined download with both methods
-            combined_output = (
-                f"Rule-based Transliteration:\n{rule_based_output}\n\n"
-                + f"Gemini 2.0 Flash Lite Enhanced Transliteration:\n{llm_output}\n\n"
-                + f"Original Coptic Text:\n{processing_text}"
-            )
+            with col2:
+                st.download_button(
+                    label="✨ Gemini Enhanced",
+                    data=llm_output,
+                    file_name=f"gemini_enhanced_{int(time.time())}.txt",
+                    mime="text/plain",
+                    use_container_width=True,
+                    help="Download the Gemini 2.0 Flash Lite enhanced transliteration",
+                )
 
-            st.download_button(
-                label="📊 Both",
-                data=combined_output,
-                file_name=f"combined_results_{int(time.time())}.txt",
-                mime="text/plain",
-                use_container_width=True,
-                help="Download both transliterations in one file",
-            )
+            with col3:
+                # Combined download with both methods
+                combined_output = (
+                    f"Rule-based Transliteration:\n{rule_based_output}\n\n"
+                    + f"Gemini 2.0 Flash Lite Enhanced Transliteration:\n{llm_output}\n\n"
+                    + f"Original Coptic Text:\n{processing_text}"
+                )
 
-        # Additional information if methods differ
-        if rule_based_output != llm_output and GEMINI_API_KEY:
+                st.download_button(
+                    label="📊 Both",
+                    data=combined_output,
+                    file_name=f"combined_results_{int(time.time())}.txt",
+                    mime="text/plain",
+                    use_container_width=True,
+                    help="Download both transliterations in one file",
+                )
+
+            # Additional information if methods differ
+            if rule_based_output != llm_output and GEMINI_API_KEY:
+                st.info(
+                    "💡 **Different Results Detected:** The AI-enhanced method produced a different result than the rule-based method. Compare both to see which better fits your needs!"
+                )
+            elif not GEMINI_API_KEY:
+                st.warning(
+                    "🔑 **API Key Not Configured:** Set your Google AI Studio API key to enable AI-enhanced transliteration for potentially improved results."
+                )
+
+        else:
+            # Placeholder when no results
             st.info(
-                "💡 **Different Results Detected:** The AI-enhanced method produced a different result than the rule-based method. Compare both to see which better fits your needs!"
+                "Enter text or upload a file and click 'Transliterate' to see results here!"
             )
-        elif not GEMINI_API_KEY:
-            st.warning(
-                "🔑 **API Key Not Configured:** Set your Google AI Studio API key to enable AI-enhanced transliteration for potentially improved results."
+
+            # Show empty text areas as placeholders
+            st.markdown(
+                '<div class="method-header rule-based-header">📝 Rule-based Method</div>',
+                unsafe_allow_html=True,
+            )
+            st.text_area(
+                "Rule-based Transliteration",
+                value="Results will appear here after transliteration",
+                height=100,
+                disabled=True,
+                key="rule_placeholder",
+                label_visibility="collapsed",
             )
 
-    else:
-        # Placeholder when no results
-        st.info(
-            "Enter text or upload a file and click 'Transliterate' to see results here!"
-        )
+            st.markdown(
+                '<div class="method-header ai-enhanced-header">✨ AI-Enhanced Method</div>',
+                unsafe_allow_html=True,
+            )
+            st.text_area(
+                "AI-Enhanced Transliteration",
+                value="Results will appear here after transliteration",
+                height=100,
+                disabled=True,
+                key="ai_placeholder",
+                label_visibility="collapsed",
+            )
 
-        # Show empty text areas as placeholders
-        st.markdown(
-            '<div class="method-header rule-based-header">📝 Rule-based Method</div>',
-            unsafe_allow_html=True,
-        )
-        st.text_area(
-            "Rule-based Transliteration",
-            value="Results will appear here after transliteration",
-            height=100,
-            disabled=True,
-            key="rule_placeholder",
-            label_visibility="collapsed",
-        )
 
-        st.markdown(
-            '<div class="method-header ai-enhanced-header">✨ AI-Enhanced Method</div>',
-            unsafe_allow_html=True,
-        )
-        st.text_area(
-            "AI-Enhanced Transliteration",
-            value="Results will appear here after transliteration",
-            height=100,
-            disabled=True,
-            key="ai_placeholder",
-            label_visibility="collapsed",
-        )
+_transliteration_interface()
 
 # Instructions section
 st.markdown("---")
@@ -988,27 +1402,4 @@ with st.expander("📖 How to Use This Tool", expanded=False):
 
 # Footer
 st.markdown("---")
-st.markdown(
-    """
-<div class="footer-box">
-    <h3>🛠️ Open Source & Free Forever</h3>
-    <p style="font-size: 1.1em; margin: 15px 0;">
-        This tool is completely open source and will always be free to use!
-    </p>
-    <p>
-        <a href="https://github.com/shehatamichael/coptic-transliterator-llm" target="_blank" 
-           style="text-decoration: none; color: white;">
-            <img src="https://img.shields.io/badge/⭐_Star_on_GitHub-white?style=for-the-badge&logo=github&logoColor=black" 
-                 alt="Star on GitHub">
-        </a>
-    </p>
-    <p style="margin-top: 20px; font-size: 1.1em;">
-        <strong>Made with ❤️ for the Coptic community</strong>
-    </p>
-    <p style="font-style: italic; opacity: 0.9;">
-        Preserving ancient language through modern technology
-    </p>
-</div>
-""",
-    unsafe_allow_html=True,
-)
+st.markdown(_footer_html(), unsafe_allow_html=True)
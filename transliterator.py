@@ -4,152 +4,407 @@
 Simple Coptic to Latin transliterator that doesn't use Pynini
 """
 
+import functools
+import logging
+import os
 import re
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Results are memoised for up to CACHE_SIZE distinct texts, each no longer
+# than CACHE_MAX_CHARS
+CACHE_SIZE = 8192
+CACHE_MAX_CHARS = 256
+
+# Below this size starting worker processes costs more than it saves
+PARALLEL_MIN_CHARS = 200_000
+
+# Basic character mappings; capitals are derived from these (see _capital_reading)
+_CHAR_MAP = {
+    "ⲁ": "a",
+    "ⲃ": "b",
+    "ⲅ": "g",
+    "ⲇ": "d",
+    "ⲉ": "e",
+    "ⲋ": "f",
+    "ⲍ": "z",
+    "ⲏ": "i",
+    "ⲑ": "th",
+    "ⲓ": "i",
+    "ⲕ": "k",
+    "ⲗ": "l",
+    "ⲙ": "m",
+    "ⲛ": "n",
+    "ⲝ": "x",
+    "ⲟ": "o",
+    "ⲡ": "p",
+    "ⲣ": "r",
+    "ⲥ": "s",
+    "ⲧ": "t",
+    "ⲩ": "u",
+    "ⲫ": "ph",
+    "ⲭ": "ch",
+    "ⲯ": "ps",
+    "ⲱ": "o",
+    "ϣ": "sh",
+    "ϥ": "f",
+    "ϧ": "kh",
+    "ϩ": "h",
+    "ϫ": "j",
+    "ϭ": "ky",
+    "ϯ": "ti",
+}
+# Readings used when none of the contextual rules below apply; these take
+# precedence over _CHAR_MAP
+_DEFAULT_READINGS = {
+    "ⲁ": "ɑː",
+    "ⲅ": "gh",
+    "ⲏ": "ee",
+}
+
+# Translation table for the basic mappings, applied in a single pass
+_CHAR_TABLE = str.maketrans({**_CHAR_MAP, **_DEFAULT_READINGS})
+
+# A capital letter reads in title case ("Th"), or fully upper case ("TH") when
+# a neighbouring letter is a capital too, as in an all-caps word. IPA letters
+# are capitalised to plain Latin letters; str.upper() would give the rarely
+# supported Ɑ (U+2C6D) and Ɪ (U+A7AE)
+_READING_CAPITALS = {"ɑ": "A", "ɪ": "I"}
+
+
+def _title_reading(reading):
+    """
+    Reading with its first character capitalised
+    """
+    first = reading[:1]
+    return _READING_CAPITALS.get(first, first.upper()) + reading[1:]
+
+
+def _upper_reading(reading):
+    """
+    Reading with every character capitalised
+    """
+    return "".join(_READING_CAPITALS.get(c, c.upper()) for c in reading)
+
+
+def _in_capital_run(text, index):
+    """
+    Whether the letter at index has a capital letter right next to it
+    """
+    return (index > 0 and text[index - 1].isupper()) or (
+        index + 1 < len(text) and text[index + 1].isupper()
+    )
+
+
+_TITLE_TABLE = {
+    coptic.upper(): _title_reading(latin)
+    for coptic, latin in {**_CHAR_MAP, **_DEFAULT_READINGS}.items()
+}
+_UPPER_TABLE = {
+    coptic.upper(): _upper_reading(latin)
+    for coptic, latin in {**_CHAR_MAP, **_DEFAULT_READINGS}.items()
+}
+# Capitals the contextual rules left over
+_CAPITAL_RE = re.compile("[%s]" % "".join(sorted(_TITLE_TABLE)))
+
+
+def _capital_reading(match):
+    """
+    Reading for a capital letter, in title or upper case depending on its neighbours
+    """
+    table = (
+        _UPPER_TABLE if _in_capital_run(match.string, match.start()) else _TITLE_TABLE
+    )
+    return table[match.group()]
+
+
+def _combining_class(first, stop):
+    """
+    Character class of the code points in [first, stop) that unicodedata
+    reports as combining
+    """
+    ranges = []
+    start = None
+    # The extra iteration closes a range that runs up to stop
+    for cp in range(first, stop + 1):
+        if cp < stop and unicodedata.combining(chr(cp)):
+            if start is None:
+                start = cp
+        elif start is not None:
+            ranges.append(f"{re.escape(chr(start))}-{re.escape(chr(cp - 1))}")
+            start = None
+    return "[" + "".join(ranges) + "]"
+
+
+# Combining diacritics stripped after normalisation (e.g., supralinear stroke).
+# Unicode assigns none beyond the first two planes. The BMP class is kept
+# separate because re compiles it to a bitmap, while a class with astral
+# ranges is tested range by range; the lookahead keeps BMP characters from
+# ever reaching the slow class
+_COMBINING_RE = re.compile(
+    _combining_class(0, 0x10000)
+    + "|(?=[\U00010000-\U0001FFFF])"
+    + _combining_class(0x10000, 0x20000)
+)
+
+# Coptic block and the Coptic letters of the Greek and Coptic block
+_COPTIC_RE = re.compile(r"[\u2C80-\u2CFF\u03E2-\u03EF]")
+# Coptic block characters the tables have no mapping for
+_UNMAPPED_RE = re.compile(r"[\u2C80-\u2CFF]+")
+
+# Context-sensitive rules in priority order: where several match at the
+# same position, the earlier one wins; anything left over falls through to
+# _CHAR_TABLE. Rules match either case, and a match starting with a capital
+# is capitalised the same way as a single capital letter
+_CONTEXT_RULES = [
+    # Alpha contextual rules
+    (r"ⲁ(?=ⲥ\b)", "æ"),  # ⲁ -> æ before ⲥ at word boundary
+    (r"ⲁ(?=\b)", "ə"),  # ⲁ -> ə at word boundary
+    # Veeta (ⲃ) contextual rules
+    (r"ⲃ(?=ⲓⲙ\b)", "b"),  # ⲃ -> b before ⲓⲙ at word boundary
+    (r"ⲃ(?=ⲧ\b)", "v"),  # ⲃ -> v before ⲧ at word boundary
+    # ⲃ -> v before vowels; ⲁ is left out because the alpha rules always
+    # rewrote it before this rule could see it
+    (r"ⲃ(?=[ⲟⲱⲓⲏⲉ])", "v"),
+    # ⲃ -> b elsewhere (before ⲣ, ⲥ, at word boundary) comes from _CHAR_MAP
+    # Gamma (ⲅ) contextual rules
+    (r"ⲅ(?=ⲅ)", "n"),  # ⲅ -> n before ⲅ
+    (r"ⲅ(?=ⲓ)", "g"),  # ⲅ -> g before ⲓ
+    (r"ⲅ(?=ⲉ)", "g"),  # ⲅ -> g before ⲉ
+    # Eeta (ⲏ) contextual rules
+    (r"ⲉⲏ", "ey"),  # ⲉⲏ -> ey
+    # Ei contextual rules
+    (r"ⲉ(?=ⲟ)", "eɪ"),  # ⲉ -> eɪ before ⲟ
+    # Multi-character sequences (doubled letters need no rule, the character
+    # table already maps ⲕⲕ, ⲙⲙ and ⲛⲛ to kk, mm and nn)
+    (r"ⲟⲩⲱ", "o'o"),
+]
+# Coptic letters, roughly from most to least frequent in running text
+_LETTER_FREQUENCY = "ⲉⲟⲁⲛⲧⲓⲥⲡⲙⲣⲩⲱⲕⲗⲏϩϣⲃⲇϥⲅϫϯⲫⲑⲭⲍϧⲝⲯⲋϭ"
+
+
+def _check_context_rules(rules):
+    """
+    Reject rules the fused _CONTEXT_RE below cannot apply: each one must
+    start with a lowercase letter from _LETTER_FREQUENCY that is not made
+    optional, or it would never fire
+    """
+    for pattern, replacement in rules:
+        if not pattern or pattern[0] not in _LETTER_FREQUENCY or pattern[1:2] in "*?{|":
+            raise ValueError(
+                f"contextual rule {pattern!r} -> {replacement!r} must start "
+                f"with a plain lowercase Coptic letter, one of {_LETTER_FREQUENCY}"
+            )
+
+
+_check_context_rules(_CONTEXT_RULES)
+
+# All rules fused into one alternation, so the text is scanned once; the
+# matching rule is looked up by its group name. Every rule starts with a plain
+# letter, and the leading lookahead on those letters lets re skip all other
+# positions without trying each alternative. Rules for different letters can
+# never match at the same position, so they are tried most frequent letter
+# first; the sort is stable and keeps the priority order within a letter
+_CONTEXT_RE = re.compile(
+    "(?=[%s])(?:%s)"
+    % (
+        "".join(sorted({pattern[0] for pattern, _ in _CONTEXT_RULES})),
+        "|".join(
+            f"(?P<r{i}>{pattern})"
+            for i, (pattern, _) in sorted(
+                enumerate(_CONTEXT_RULES),
+                key=lambda rule: _LETTER_FREQUENCY.index(rule[1][0][0]),
+            )
+        ),
+    ),
+    re.IGNORECASE,
+)
+_CONTEXT_REPLACEMENTS = {
+    f"r{i}": replacement for i, (_, replacement) in enumerate(_CONTEXT_RULES)
+}
+_CONTEXT_TITLE = {
+    name: _title_reading(replacement)
+    for name, replacement in _CONTEXT_REPLACEMENTS.items()
+}
+_CONTEXT_UPPER = {
+    name: _upper_reading(replacement)
+    for name, replacement in _CONTEXT_REPLACEMENTS.items()
+}
+
+
+def _apply_contextual_rules(text):
+    """
+    Apply context-sensitive transliteration rules
+    """
+    return _CONTEXT_RE.sub(_contextual_replacement, text)
+
+
+def _contextual_replacement(match):
+    """
+    Reading for a contextual rule match, in the case of its first letter
+    """
+    if not match.group()[0].isupper():
+        return _CONTEXT_REPLACEMENTS[match.lastgroup]
+    if _in_capital_run(match.string, match.start()):
+        return _CONTEXT_UPPER[match.lastgroup]
+    return _CONTEXT_TITLE[match.lastgroup]
+
+
+def _has_coptic(text):
+    """
+    Whether text contains any Coptic letter
+    """
+    return not text.isascii() and _COPTIC_RE.search(text) is not None
+
+
+def translit(text):
+    """
+    Transliterate Coptic text to Latin script
+    """
+    # Nothing to transliterate without Coptic letters
+    if not _has_coptic(text):
+        return text
+    # Short texts repeat a lot (particles, articles), long ones rarely do
+    if len(text) <= CACHE_MAX_CHARS:
+        return _translit_cached(text)
+    return _translit(text)
+
+
+def _translit(text):
+    """
+    Transliterate text known to contain Coptic letters
+    """
+    # Normalize input to decompose combining characters
+    text = unicodedata.normalize("NFD", text)
+    # Remove combining diacritics (e.g., supralinear stroke)
+    text = _COMBINING_RE.sub("", text)
+    # Apply contextual rules first (similar to original pynini rules)
+    result = _apply_contextual_rules(text)
+
+    # Apply basic character mappings, capitals first since their case
+    # depends on the letters around them
+    result = _CAPITAL_RE.sub(_capital_reading, result)
+    result = result.translate(_CHAR_TABLE)
+
+    # Replace any remaining unmapped Coptic characters with a placeholder or warning
+    if logger.isEnabledFor(logging.WARNING) and _UNMAPPED_RE.search(result):
+        unmapped = "".join(_UNMAPPED_RE.findall(result))
+        logger.warning("Unmapped Coptic characters found: %s", unmapped)
+    return result
+
+
+_translit_cached = functools.lru_cache(maxsize=CACHE_SIZE)(_translit)
+
+
+def translit_tokens(tokens):
+    """
+    Transliterate tokens one by one, reusing results for repeated tokens
+    """
+    return [translit(token) for token in tokens]
+
+
+# Separates texts joined for batch transliteration; no rule matches across it
+_BATCH_SEPARATOR = "\x00"
+
+
+def translit_batch(texts):
+    """
+    Transliterate many texts in a single pass over their concatenation
+    """
+    texts = list(texts)
+    # Texts without Coptic letters are returned unchanged, as in translit(),
+    # and a text containing the separator can't be split back out
+    batch = [
+        i
+        for i, text in enumerate(texts)
+        if _BATCH_SEPARATOR not in text and _has_coptic(text)
+    ]
+    results = [translit(text) if _BATCH_SEPARATOR in text else text for text in texts]
+    if batch:
+        joined = translit(_BATCH_SEPARATOR.join(texts[i] for i in batch))
+        for i, result in zip(batch, joined.split(_BATCH_SEPARATOR)):
+            results[i] = result
+    return results
+
+
+def translit_document(text, workers=None):
+    """
+    Transliterate a long document, spreading its paragraphs over processes
+    """
+    workers = workers or os.cpu_count() or 1
+    paragraphs = text.split("\n\n")
+    if (
+        len(text) < PARALLEL_MIN_CHARS
+        or workers == 1
+        or len(paragraphs) == 1
+        or not _has_coptic(text)
+    ):
+        return translit(text)
+    # No rule looks across a line break, so paragraphs are independent; they
+    # skip the fast path so that paragraphs without Coptic letters come out
+    # the same as they would in translit(text)
+    with ProcessPoolExecutor(workers) as executor:
+        return "\n\n".join(
+            executor.map(
+                _translit, paragraphs, chunksize=max(1, len(paragraphs) // workers)
+            )
+        )
 
 
 class CopticTransliterator:
-    def __init__(self):
-        # Basic character mappings
-        self.char_map = {
-            "ⲁ": "a",
-            "Ⲁ": "A",
-            "ⲃ": "b",
-            "Ⲃ": "B",
-            "ⲅ": "g",
-            "Ⲅ": "G",
-            "ⲇ": "d",
-            "Ⲇ": "D",
-            "ⲉ": "e",
-            "Ⲉ": "E",
-            "ⲋ": "f",
-            "Ⲋ": "F",
-            "ⲍ": "z",
-            "Ⲍ": "Z",
-            "ⲏ": "i",
-            "Ⲏ": "I",
-            "ⲑ": "th",
-            "Ⲑ": "TH",
-            "ⲓ": "i",
-            "Ⲓ": "I",
-            "ⲕ": "k",
-            "Ⲕ": "K",
-            "ⲗ": "l",
-            "Ⲗ": "L",
-            "ⲙ": "m",
-            "Ⲙ": "M",
-            "ⲛ": "n",
-            "Ⲛ": "N",
-            "ⲝ": "x",
-            "Ⲝ": "X",
-            "ⲟ": "o",
-            "Ⲟ": "O",
-            "ⲡ": "p",
-            "Ⲡ": "P",
-            "ⲣ": "r",
-            "Ⲣ": "R",
-            "ⲥ": "s",
-            "Ⲥ": "S",
-            "ⲧ": "t",
-            "Ⲧ": "T",
-            "ⲩ": "u",
-            "Ⲩ": "U",
-            "ⲫ": "ph",
-            "Ⲫ": "PH",
-            "ⲭ": "ch",
-            "Ⲭ": "CH",
-            "ⲯ": "ps",
-            "Ⲯ": "PS",
-            "ⲱ": "o",
-            "Ⲱ": "O",
-            "ϣ": "sh",
-            "Ϣ": "SH",
-            "ϥ": "f",
-            "Ϥ": "F",
-            "ϧ": "kh",
-            "Ϧ": "KH",
-            "ϩ": "h",
-            "Ϩ": "H",
-            "ϫ": "j",
-            "Ϫ": "J",
-            "ϭ": "ky",
-            "Ϭ": "KY",
-            "ϯ": "ti",
-            "Ϯ": "TI",
-        }
+    # Tables are built once at import and shared by every instance
+    char_map = _CHAR_MAP
 
     def translit(self, text):
         """
         Transliterate Coptic text to Latin script
         """
-        # Normalize input to decompose combining characters
-        text = unicodedata.normalize("NFKD", text)
-        # Remove combining diacritics (e.g., supralinear stroke)
-        text = "".join(c for c in text if not unicodedata.combining(c))
-        # Apply contextual rules first (similar to original pynini rules)
-        result = self._apply_contextual_rules(text.lower())
-
-        # Apply basic character mappings
-        for coptic_char, latin_char in self.char_map.items():
-            result = result.replace(coptic_char.lower(), latin_char.lower())
-
-        # Replace any remaining unmapped Coptic characters with a placeholder or warning
-        unmapped = "".join(c for c in result if ord(c) >= 0x2C80 and ord(c) <= 0x2CFF)
-        if unmapped:
-            print(f"Warning: Unmapped Coptic characters found: {unmapped}")
-        return result
+        return translit(text)
+
+    def translit_batch(self, texts):
+        """
+        Transliterate many texts in a single pass over their concatenation
+        """
+        return translit_batch(texts)
+
+    def translit_tokens(self, tokens):
+        """
+        Transliterate tokens one by one, reusing results for repeated tokens
+        """
+        return translit_tokens(tokens)
+
+    def translit_document(self, text, workers=None):
+        """
+        Transliterate a long document, spreading its paragraphs over processes
+        """
+        return translit_document(text, workers)
 
     def _apply_contextual_rules(self, text):
         """
         Apply context-sensitive transliteration rules
         """
-        # Alpha contextual rules
-        text = re.sub(r"ⲁ(?=ⲥ\b)", "æ", text)  # ⲁ -> æ before ⲥ at word boundary
-        text = re.sub(r"ⲁ(?=\b)", "ə", text)  # ⲁ -> ə at word boundary
-        text = re.sub(r"ⲁ", "ɑː", text)  # ⲁ -> ɑː elsewhere
-
-        # Veeta (ⲃ) contextual rules
-        text = re.sub(r"ⲃ(?=ⲓⲙ\b)", "b", text)  # ⲃ -> b before ⲓⲙ at word boundary
-        text = re.sub(r"ⲃ(?=ⲧ\b)", "v", text)  # ⲃ -> v before ⲧ at word boundary
-        text = re.sub(r"ⲃ(?=[ⲁⲟⲱⲓⲏⲉ])", "v", text)  # ⲃ -> v before vowels
-        text = re.sub(r"ⲃ(?=ⲣ)", "b", text)  # ⲃ -> b before ⲣ
-        text = re.sub(r"ⲃ(?=ⲥ)", "b", text)  # ⲃ -> b before ⲥ
-        text = re.sub(r"ⲃ(?=\b)", "b", text)  # ⲃ -> b at word boundary
-
-        # Gamma (ⲅ) contextual rules
-        text = re.sub(r"ⲅ(?=ⲅ)", "n", text)  # ⲅ -> n before ⲅ
-        text = re.sub(r"ⲅ(?=ⲓ)", "g", text)  # ⲅ -> g before ⲓ
-        text = re.sub(r"ⲅ(?=ⲉ)", "g", text)  # ⲅ -> g before ⲉ
-        text = re.sub(r"ⲅ", "gh", text)  # ⲅ -> gh elsewhere
-
-        # Eeta (ⲏ) contextual rules
-        text = re.sub(r"ⲉ(ⲏ)", r"ey", text)  # ⲉⲏ -> ey
-
-        # Ei contextual rules
-        text = re.sub(r"ⲉ(?=ⲟ)", "eɪ", text)  # ⲉ -> eɪ before ⲟ
-        text = re.sub(r"ⲏ", "ee", text)  # ⲏ -> ee (general case)
-
-        # Multi-character sequences
-        text = re.sub(r"ⲕⲕ", "kk", text)
-        text = re.sub(r"ⲙⲙ", "mm", text)
-        text = re.sub(r"ⲛⲛ", "nn", text)
-        text = re.sub(r"ⲟⲓⲁ", "ia", text)
-        text = re.sub(r"ⲟⲩⲱ", "o'o", text)
-
-        return text
+        return _apply_contextual_rules(text)
 
 
 # Create instance for easy use
 transliterator = CopticTransliterator()
 
 
-def translit(text):
-    return transliterator.translit(text)
-
-
 # Example usage
 if __name__ == "__main__":
     # Test with some Coptic text
     test_text = "ⲁⲛⲟⲕ ⲟⲩⲛ ⲟⲩⲙⲁⲓⲛⲟⲩⲧⲉ"
     print(f"Original: {test_text}")
     print(f"Transliterated: {translit(test_text)}")
+
+    # Capitals read in title case, or in upper case inside an all-caps word
+    for coptic, expected in [
+        ("Ⲑⲉⲟⲥ", "Theɪos"),
+        ("ⲐⲈⲞⲤ", "THEIOS"),
+        ("Ⲁⲛⲟⲕ", "Aːnok"),
+        ("ⲀⲄⲀⲠⲎ", "AːGHAːPEE"),
+        ("ⲈⲞⲨⲰ", "EIO'O"),
+    ]:
+        assert translit(coptic) == expected, (coptic, translit(coptic))